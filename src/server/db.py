@@ -1,61 +1,255 @@
-from typing import Dict, List, Optional
-from .models import OrderOutput
+import math
+from array import array
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import orjson
+
+from .models import OrderStatus
+
+# Statuses are stored as one byte per order, indexed by these codes
+_STATUSES = (OrderStatus.PENDING, OrderStatus.EXECUTED, OrderStatus.CANCELLED)
+_STATUS_CODES = {status: code for code, status in enumerate(_STATUSES)}
+
+
+@dataclass(slots=True)
+class OrderRow:
+    """
+    Lightweight order record handed out by the repository
+
+    Attributes:
+        id: Unique identifier for the order
+        stocks: Symbol of the stock being traded
+        quantity: Number of shares to trade
+        status: Current status of the order
+        order_date: Timestamp when the order was placed
+        executed_date: Timestamp when the order was executed
+    """
+
+    id: str
+    stocks: str
+    quantity: float
+    status: OrderStatus
+    order_date: Optional[float]
+    executed_date: Optional[float] = None
+
+
+def _pack_date(value: Optional[float]) -> float:
+    """Encode an optional timestamp as a float, using NaN for None"""
+    return math.nan if value is None else value
+
+
+def _unpack_date(value: float) -> Optional[float]:
+    """Decode a timestamp stored by _pack_date"""
+    return None if math.isnan(value) else value
+
 
 class OrderRepository:
     """
     Repository class for managing orders in memory
+
+    Orders are stored column-wise, one array per field, with an index from
+    order ID to row. OrderRow records are only built when orders are read.
+    The JSON encoding of each order, and a read-only snapshot of all orders
+    with its JSON encoding, are cached until the next write.
     """
     def __init__(self):
         """Initialize an empty order database"""
-        self._orders: Dict[str, OrderOutput] = {}
+        self.clear()
+
+    def _row(self, row: int) -> OrderRow:
+        """
+        Build an order from its stored columns
+
+        Args:
+            row (int): Row number of the order
+
+        Returns:
+            OrderRow: Order stored in the given row
+        """
+        return OrderRow(
+            self._ids[row],
+            self._stocks[row],
+            self._quantity[row],
+            _STATUSES[self._status[row]],
+            _unpack_date(self._order_date[row]),
+            _unpack_date(self._executed_date[row]),
+        )
+
+    def _row_json(self, row: int) -> bytes:
+        """
+        Return the cached JSON encoding of an order, encoding it if needed
+
+        Args:
+            row (int): Row number of the order
+
+        Returns:
+            bytes: JSON encoded order
+        """
+        payload = self._json[row]
+        if payload is None:
+            payload = orjson.dumps(
+                {
+                    "id": self._ids[row],
+                    "stocks": self._stocks[row],
+                    "quantity": self._quantity[row],
+                    "status": _STATUSES[self._status[row]],
+                    "order_date": _unpack_date(self._order_date[row]),
+                    "executed_date": _unpack_date(self._executed_date[row]),
+                }
+            )
+            self._json[row] = payload
+        return payload
+
+    def _invalidate(self, row: int) -> None:
+        """
+        Drop the cached encodings affected by a change to an order
+
+        Args:
+            row (int): Row number of the changed order
+        """
+        self._json[row] = None
+        self._snapshot = None
+        self._snapshot_json = None
 
-    def add(self, order: OrderOutput) -> None:
+    def add(self, order: OrderRow) -> None:
         """
         Add a new order to the database
-        
+
         Args:
-            order (OrderOutput): Order to be stored
+            order (OrderRow): Order to be stored
         """
-        self._orders[order.id] = order
+        if order.id in self._index:
+            self.update(order)
+            return
+
+        self._index[order.id] = len(self._ids)
+        self._ids.append(order.id)
+        self._stocks.append(order.stocks)
+        self._quantity.append(order.quantity)
+        self._status.append(_STATUS_CODES[order.status])
+        self._order_date.append(_pack_date(order.order_date))
+        self._executed_date.append(_pack_date(order.executed_date))
+        self._json.append(None)
+        self._invalidate(self._index[order.id])
 
-    def get(self, order_id: str) -> Optional[OrderOutput]:
+    def get(self, order_id: str) -> Optional[OrderRow]:
         """
         Retrieve an order by its ID
-        
+
+        Args:
+            order_id (str): Unique identifier of the order
+
+        Returns:
+            Optional[OrderRow]: Order if found, None otherwise
+        """
+        row = self._index.get(order_id)
+        if row is None:
+            return None
+        return self._row(row)
+
+    def get_json(self, order_id: str) -> Optional[bytes]:
+        """
+        Retrieve the JSON encoding of an order by its ID
+
         Args:
             order_id (str): Unique identifier of the order
-            
+
         Returns:
-            Optional[OrderOutput]: Order if found, None otherwise
+            Optional[bytes]: JSON encoded order if found, None otherwise
         """
-        return self._orders.get(order_id)
+        row = self._index.get(order_id)
+        if row is None:
+            return None
+        return self._row_json(row)
 
-    def get_all(self) -> List[OrderOutput]:
+    def get_all(self) -> Tuple[OrderRow, ...]:
         """
         Retrieve all orders
-        
+
+        The same snapshot is returned until the next write, so callers must not
+        modify the records in it.
+
         Returns:
-            List[OrderOutput]: List of all orders
+            Tuple[OrderRow, ...]: Snapshot of all orders
         """
-        return list(self._orders.values())
+        if self._snapshot is None:
+            self._snapshot = tuple(self._row(row) for row in range(len(self._ids)))
+        return self._snapshot
 
-    def update(self, order: OrderOutput) -> None:
+    def get_all_json(self) -> bytes:
+        """
+        Retrieve the JSON encoding of all orders
+
+        Returns:
+            bytes: JSON array of all orders, cached until the next write
+        """
+        if self._snapshot_json is None:
+            self._snapshot_json = (
+                b"[" + b",".join(map(self._row_json, range(len(self._ids)))) + b"]"
+            )
+        return self._snapshot_json
+
+    def update(self, order: OrderRow) -> None:
         """
         Update an existing order
-        
+
+        Args:
+            order (OrderRow): Order with updated information
+        """
+        row = self._index.get(order.id)
+        if row is None:
+            self.add(order)
+            return
+
+        self._stocks[row] = order.stocks
+        self._quantity[row] = order.quantity
+        self._status[row] = _STATUS_CODES[order.status]
+        self._order_date[row] = _pack_date(order.order_date)
+        self._executed_date[row] = _pack_date(order.executed_date)
+        self._invalidate(row)
+
+    def set_status(
+        self,
+        order_id: str,
+        status: OrderStatus,
+        executed_date: Optional[float] = None,
+    ) -> None:
+        """
+        Change the status of an existing order in place
+
         Args:
-            order (OrderOutput): Order with updated information
+            order_id (str): Unique identifier of the order
+            status (OrderStatus): New status of the order
+            executed_date (Optional[float]): Execution timestamp to record, if any
         """
-        self._orders[order.id] = order
+        row = self._index[order_id]
+        self._status[row] = _STATUS_CODES[status]
+        if executed_date is not None:
+            self._executed_date[row] = executed_date
+        self._invalidate(row)
 
     def exists(self, order_id: str) -> bool:
         """
         Check if an order exists
-        
+
         Args:
             order_id (str): Order ID to check
-            
+
         Returns:
             bool: True if order exists, False otherwise
         """
-        return order_id in self._orders
+        return order_id in self._index
+
+    def clear(self) -> None:
+        """Remove all orders"""
+        self._index: Dict[str, int] = {}
+        self._ids: List[str] = []
+        self._stocks: List[str] = []
+        self._quantity = array("d")
+        self._status = bytearray()
+        self._order_date = array("d")
+        self._executed_date = array("d")
+        self._json: List[Optional[bytes]] = []
+        self._snapshot: Optional[Tuple[OrderRow, ...]] = None
+        self._snapshot_json: Optional[bytes] = None
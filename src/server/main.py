@@ -1,14 +1,26 @@
 import asyncio
 import logging
+import os
 import random
+import time
 import uuid
 from datetime import datetime
-from typing import List
+from typing import Dict, List, Optional, Set, Tuple
 
+import orjson
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
-
-from .db import OrderRepository
+from fastapi import (
+    FastAPI,
+    HTTPException,
+    Request,
+    Response,
+    WebSocket,
+    WebSocketDisconnect,
+)
+from fastapi.utils import is_body_allowed_for_status_code
+from starlette.exceptions import HTTPException as StarletteHTTPException
+
+from .db import OrderRepository, OrderRow
 from .models import Error, HealthCheck, OrderInput, OrderOutput, OrderStatus
 
 # Initialize logging
@@ -18,13 +30,181 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
+# Upper bound (seconds) of the artificial latency added to REST handlers, 0 disables it
+SIMULATE_DELAY_MAX = float(os.getenv("SIMULATE_DELAY_MAX", "0"))
+
+# Error body shared by every "order not found" response
+NOT_FOUND_ERROR = Error(code=404, message="Order not found").model_dump()
+
+# Reply to a client "ping", sent through the client's queue like every other message
+PONG = "pong"
+
+# Seconds a client gets to accept a frame before it is disconnected
+CLIENT_SEND_TIMEOUT = 2.0
+
+# Max number of encoded messages buffered per WebSocket client, a client that
+# falls further behind is disconnected
+CLIENT_QUEUE_SIZE = 256
+
 app = FastAPI(title="Forex Trading Platform API")
 
 # Initialize database
 order_repository = OrderRepository()
 
-# Active WebSocket connections
-active_connections: List[WebSocket] = []
+# Active WebSocket connections mapped to their outbound message queue and writer task
+active_connections: Dict[WebSocket, Tuple["asyncio.Queue[str]", "asyncio.Task"]] = {}
+
+# Pending close calls for disconnected slow clients, kept so they are not garbage collected
+close_tasks: Set["asyncio.Task"] = set()
+
+
+async def send_frame(websocket: WebSocket, text: str):
+    """
+    Send one text frame, giving up after CLIENT_SEND_TIMEOUT seconds
+
+    Args:
+        websocket (WebSocket): WebSocket connection instance
+        text (str): Frame content
+
+    Raises:
+        asyncio.TimeoutError: If the client did not accept the frame in time
+    """
+    async with asyncio.timeout(CLIENT_SEND_TIMEOUT):
+        await websocket.send_text(text)
+
+
+async def send_events(websocket: WebSocket, events: List[str]):
+    """
+    Send encoded events to a client as a single frame
+
+    Args:
+        websocket (WebSocket): WebSocket connection instance
+        events (List[str]): JSON-encoded events, sent unwrapped when there is only one
+    """
+    if len(events) == 1:
+        await send_frame(websocket, events[0])
+    elif events:
+        await send_frame(websocket, '{"type":"batch","events":[' + ",".join(events) + "]}")
+
+
+async def client_writer(websocket: WebSocket, queue: "asyncio.Queue[str]"):
+    """
+    Deliver queued messages to a single WebSocket client
+
+    Waits for the next message, then drains everything else already queued and
+    sends it as one {"type": "batch", "events": [...]} frame. A lone message is
+    sent as is, and PONG replies are always sent on their own.
+
+    Args:
+        websocket (WebSocket): WebSocket connection instance
+        queue (asyncio.Queue[str]): JSON-encoded messages waiting for this client
+    """
+    try:
+        while True:
+            batch = [await queue.get()]
+            while True:
+                try:
+                    batch.append(queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+
+            events = []
+            for message in batch:
+                if message == PONG:
+                    await send_events(websocket, events)
+                    events = []
+                    await send_frame(websocket, PONG)
+                else:
+                    events.append(message)
+            await send_events(websocket, events)
+    except asyncio.TimeoutError:
+        logger.warning("WebSocket client did not accept a message in time, disconnecting client")
+    except (WebSocketDisconnect, OSError, RuntimeError) as e:
+        # The client went away or the socket is already closing
+        logger.info(f"WebSocket writer stopped, client disconnected: {str(e)}")
+    except Exception as e:
+        logger.error(f"WebSocket writer error: {str(e)}")
+    finally:
+        # Stop broadcasting to a client nobody is writing to any more and make
+        # sure its socket is closed; a no-op if it was already disconnected
+        disconnect_client(websocket)
+
+
+def order_event(order: OrderRow, **extra) -> dict:
+    """
+    Build the WebSocket representation of an order
+
+    Args:
+        order (OrderRow): Order to describe
+        **extra: Additional fields to include, e.g. the event timestamp
+
+    Returns:
+        dict: Order fields as sent to WebSocket clients
+    """
+    return {
+        "order_id": order.id,
+        "status": order.status,
+        "stocks": order.stocks,
+        "quantity": order.quantity,
+        **extra,
+    }
+
+
+def enqueue_message(websocket: WebSocket, payload: str):
+    """
+    Queue an encoded message for a client, disconnecting it if its queue is full
+
+    Args:
+        websocket (WebSocket): WebSocket connection instance
+        payload (str): JSON-encoded message
+    """
+    connection = active_connections.get(websocket)
+    if connection is None:
+        return
+
+    try:
+        connection[0].put_nowait(payload)
+    except asyncio.QueueFull:
+        logger.warning("WebSocket client queue full, disconnecting client")
+        disconnect_client(websocket)
+
+
+async def close_client(websocket: WebSocket):
+    """
+    Close a client connection that is being dropped as too slow
+
+    Args:
+        websocket (WebSocket): WebSocket connection instance
+    """
+    try:
+        await websocket.close(code=1008, reason="Client too slow")
+    except Exception as e:
+        # Usually the client has already gone away
+        logger.info(f"WebSocket close skipped: {str(e)}")
+
+
+def disconnect_client(websocket: WebSocket):
+    """
+    Stop delivering messages to a client and close its connection
+
+    The writer task is cancelled rather than asked to close the socket, since a
+    slow client usually leaves it blocked in a send that would never return.
+    Does nothing for a client that is no longer registered.
+
+    Args:
+        websocket (WebSocket): WebSocket connection instance
+    """
+    connection = active_connections.pop(websocket, None)
+    if connection is None:
+        return
+
+    _, writer_task = connection
+    # The writer calls this itself when it stops, and then just returns
+    if writer_task is not asyncio.current_task():
+        writer_task.cancel()
+    task = asyncio.create_task(close_client(websocket))
+    close_tasks.add(task)
+    task.add_done_callback(close_tasks.discard)
 
 
 @app.websocket("/ws")
@@ -36,13 +216,15 @@ async def websocket_endpoint(websocket: WebSocket):
         websocket (WebSocket): WebSocket connection instance
     """
     await websocket.accept()
-    active_connections.append(websocket)
+    queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+    writer_task = asyncio.create_task(client_writer(websocket, queue))
+    active_connections[websocket] = (queue, writer_task)
     try:
         while True:
             data = await websocket.receive_text()
             logger.info(f"Received WebSocket message: {data}")
             if data == "ping":
-                await websocket.send_text("pong")
+                enqueue_message(websocket, PONG)
                 continue
 
             if data == "get_orders":
@@ -50,71 +232,98 @@ async def websocket_endpoint(websocket: WebSocket):
                 current_orders = order_repository.get_all()
                 message = {
                     "type": "orders_update",
-                    "data": [
-                        {
-                            "order_id": order.id,
-                            "status": order.status,
-                            "stocks": order.stocks,
-                            "quantity": order.quantity,
-                        }
-                        for order in current_orders
-                    ],
+                    "data": [order_event(order) for order in current_orders],
                 }
-                logger.info(f"Sending message: {message}")
-                await websocket.send_json(message)
+                payload = orjson.dumps(message).decode()
+                logger.info("Sending message: %s", payload)
+                enqueue_message(websocket, payload)
     except WebSocketDisconnect:
-        active_connections.remove(websocket)
         logger.info("WebSocket disconnected")
     except Exception as e:
         logger.error(f"WebSocket error: {str(e)}")
-        if websocket in active_connections:
-            active_connections.remove(websocket)
+    finally:
+        active_connections.pop(websocket, None)
+        writer_task.cancel()
 
 
-async def notify_status_change(order: OrderOutput):
+async def notify_status_change(order: OrderRow):
     """
     Notify all connected clients about order status changes
 
     Args:
-        order (OrderOutput): The order that was updated
+        order (OrderRow): The order that was updated
     """
     if active_connections:
         message = {
             "type": "status_change",
-            "data": {
-                "order_id": order.id,
-                "status": order.status,
-                "stocks": order.stocks,
-                "quantity": order.quantity,
-                "timestamp": datetime.now().timestamp(),
-            },
+            "data": order_event(order, timestamp=datetime.now().timestamp()),
         }
-        print(f"Broadcasting status change: {message}")  # Debug log
-
-        disconnected = []
-        for connection in active_connections:
-            try:
-                await connection.send_json(message)
-            except WebSocketDisconnect:
-                disconnected.append(connection)
-            except Exception as e:
-                print(f"Error sending message: {str(e)}")  # Debug log
-                disconnected.append(connection)
-
-        # Clean up disconnected clients
-        for connection in disconnected:
-            if connection in active_connections:
-                active_connections.remove(connection)
+        # Encode once and hand the same payload to each client's writer task
+        payload = orjson.dumps(message).decode()
+        logger.debug("Broadcasting status change: %s", payload)
+        for websocket in list(active_connections):
+            enqueue_message(websocket, payload)
 
 
 async def simulate_delay():
     """
     Simulates network or processing delay
 
-    Adds a random delay between 0.1 and 1 second to make the API behave more realistically
+    Adds a random delay of up to SIMULATE_DELAY_MAX seconds to make the API behave
+    more realistically. Does nothing when SIMULATE_DELAY_MAX is 0 (the default).
+    """
+    if SIMULATE_DELAY_MAX:
+        await asyncio.sleep(random.uniform(0, SIMULATE_DELAY_MAX))
+
+
+def json_response(
+    payload: bytes,
+    status_code: int = 200,
+    headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    """
+    Build a response from an already encoded JSON payload
+
+    The payload is sent as is, skipping the response model validation FastAPI
+    would otherwise run on an already validated object. A route's response_model
+    is then only used for the API documentation.
+
+    Args:
+        payload (bytes): JSON encoded body
+        status_code (int): HTTP status code of the response
+        headers (Optional[Dict[str, str]]): Extra response headers
+
+    Returns:
+        Response: JSON response
     """
-    delay = random.uniform(0.1, 1.0)
-    await asyncio.sleep(delay)
+    return Response(
+        payload,
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json",
+    )
+
+
+@app.exception_handler(StarletteHTTPException)
+async def http_exception_handler(request: Request, exc: StarletteHTTPException):
+    """
+    Render API and routing errors with orjson, like every other JSON body in the service
+
+    Args:
+        request (Request): Request that raised the error
+        exc (StarletteHTTPException): Raised error
+
+    Returns:
+        Response: JSON response with the error in its "detail" field, or an empty
+        response for statuses that must not have a body
+    """
+    if not is_body_allowed_for_status_code(exc.status_code):
+        return Response(status_code=exc.status_code, headers=exc.headers)
+    return json_response(
+        orjson.dumps({"detail": exc.detail}),
+        status_code=exc.status_code,
+        headers=exc.headers,
+    )
 
 
 @app.get("/health", response_model=HealthCheck)
@@ -126,7 +335,7 @@ async def health_check():
         HealthCheck: Object containing service status and current timestamp
     """
     logger.info("Health check endpoint called")
-    return HealthCheck(status="ok", date=datetime.now().timestamp())
+    return HealthCheck(status="ok", date=time.time())
 
 
 @app.get("/orders", response_model=List[OrderOutput])
@@ -139,7 +348,9 @@ async def get_orders():
     """
     logger.info("Get orders endpoint called")
     await simulate_delay()
-    return order_repository.get_all()
+    # The repository caches the encoded listing until the next write, which
+    # also spares FastAPI revalidating every order against the response model
+    return json_response(order_repository.get_all_json())
 
 
 @app.post("/orders", response_model=OrderOutput, status_code=201)
@@ -158,19 +369,20 @@ async def place_order(order: OrderInput):
     )
     await simulate_delay()
 
-    order_id = str(uuid.uuid4())
-    order_output = OrderOutput(
+    order_id = uuid.uuid4().hex
+    # OrderInput has already validated the fields, so build the record directly
+    order_row = OrderRow(
         id=order_id,
         stocks=order.stocks,
         quantity=order.quantity,
         status=OrderStatus.PENDING,
         order_date=datetime.now().timestamp(),
     )
-    order_repository.add(order_output)
+    order_repository.add(order_row)
 
-    await notify_status_change(order_output)
-    logger.info(f"Order placed: {order_output}")
-    return order_output
+    await notify_status_change(order_row)
+    logger.info(f"Order placed: {order_row}")
+    return json_response(order_repository.get_json(order_id), status_code=201)
 
 
 @app.post("/orders/{order_id}/execute", response_model=OrderOutput)
@@ -193,7 +405,7 @@ async def execute_order(order_id: str):
     if not order:
         raise HTTPException(
             status_code=404,
-            detail=Error(code=404, message="Order not found").model_dump(),
+            detail=NOT_FOUND_ERROR,
         )
 
     if order.status != OrderStatus.PENDING:
@@ -207,9 +419,9 @@ async def execute_order(order_id: str):
 
     order.status = OrderStatus.EXECUTED
     order.executed_date = datetime.now().timestamp()
-    order_repository.update(order)
+    order_repository.set_status(order.id, order.status, order.executed_date)
     await notify_status_change(order)
-    return order
+    return json_response(order_repository.get_json(order.id))
 
 
 @app.get("/orders/{order_id}", response_model=OrderOutput)
@@ -228,13 +440,13 @@ async def get_order(order_id: str):
     """
     await simulate_delay()
 
-    order = order_repository.get(order_id)
-    if not order:
+    payload = order_repository.get_json(order_id)
+    if payload is None:
         raise HTTPException(
             status_code=404,
-            detail=Error(code=404, message="Order not found").model_dump(),
+            detail=NOT_FOUND_ERROR,
         )
-    return order
+    return json_response(payload)
 
 
 @app.delete("/orders/{order_id}", response_model=OrderOutput)
@@ -257,7 +469,7 @@ async def cancel_order(order_id: str):
     if not order:
         raise HTTPException(
             status_code=404,
-            detail=Error(code=404, message="Order not found").model_dump(),
+            detail=NOT_FOUND_ERROR,
         )
 
     if order.status != OrderStatus.PENDING:
@@ -270,6 +482,6 @@ async def cancel_order(order_id: str):
         )
 
     order.status = OrderStatus.CANCELLED
-    order_repository.update(order)
+    order_repository.set_status(order.id, order.status)
     await notify_status_change(order)
-    return order
+    return json_response(order_repository.get_json(order.id))
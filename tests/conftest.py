@@ -1,26 +1,41 @@
+import asyncio
 import os
 
 import pytest
 from fastapi.testclient import TestClient
 
-from server.main import app, order_repository
+from server.main import active_connections, app, close_tasks, order_repository
 
 BASE_URL = os.getenv("BASE_URL", "http://localhost:8080")
 
 
-@pytest.fixture(scope="function")
+async def reset_connections():
+    """
+    Cancel the writer and close tasks of WebSocket connections left behind by a test
+    """
+    tasks = [writer_task for _, writer_task in active_connections.values()]
+    tasks.extend(close_tasks)
+    active_connections.clear()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+@pytest.fixture(scope="session")
 def client():
-    # Setup: Create a new TestClient instance
+    # Setup: Create one TestClient instance shared by the whole test session
     with TestClient(app=app, base_url=BASE_URL) as client:
         yield client
 
 
 @pytest.fixture(autouse=True)
-def clear_repository():
+def clear_repository(client):
     """
-    Automatically clean the repository before each test.
+    Automatically clean the repository and WebSocket registry before each test.
     """
-    # Before test: Clear the repository
-    order_repository._orders.clear()
+    # Before test: Clear the repository and stop any leftover connections on the
+    # shared client's event loop
+    order_repository.clear()
+    client.portal.call(reset_connections)
 
     yield
@@ -1,5 +1,3 @@
-import asyncio
-
 import pytest
 
 
@@ -27,6 +25,20 @@ async def test_get_orders(client):
     assert len(orders) == 1
 
 
+@pytest.mark.asyncio
+async def test_get_orders_reflects_status_change(client):
+    create_response = client.post("/orders", json={"stocks": "POIU", "quantity": 3})
+    order_id = create_response.json()["id"]
+
+    # Read the list once so it is cached, then change the order
+    assert client.get("/orders").json()[0]["status"] == "PENDING"
+    client.post(f"/orders/{order_id}/execute")
+
+    orders = client.get("/orders").json()
+    assert len(orders) == 1
+    assert orders[0]["status"] == "EXECUTED"
+
+
 @pytest.mark.asyncio
 async def test_get_order_by_id(client):
     # Create a new order
@@ -63,8 +75,7 @@ async def test_execute_order(client):
     create_response = client.post("/orders", json={"stocks": "LKJH", "quantity": 20})
     order_id = create_response.json()["id"]
 
-    # Allow the order to auto-execute and fetch the status
-    await asyncio.sleep(2)
+    # Execute the order explicitly, orders are never executed in the background
     response = client.post(f"/orders/{order_id}/execute")
     assert response.status_code == 200
     assert response.json()["status"] == "EXECUTED"
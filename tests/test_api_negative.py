@@ -17,6 +17,7 @@ async def test_get_non_existent_order(client):
     # Using an invalid or non-existent order ID
     response = client.get("/orders/non_existent_id")
     assert response.status_code == 404
+    assert response.json()["detail"] == {"code": 404, "message": "Order not found"}
 
 
 @pytest.mark.asyncio
@@ -61,3 +62,17 @@ async def test_execute_non_executable_order(client):
     # Try to execute the canceled order
     response = client.post(f"/orders/{order_id}/execute")
     assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_routing_errors(client):
+    # Unknown path
+    response = client.get("/non_existent_path")
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Not Found"}
+
+    # Unsupported method on a known path
+    response = client.put("/orders")
+    assert response.status_code == 405
+    assert response.json() == {"detail": "Method Not Allowed"}
+    assert "allow" in response.headers
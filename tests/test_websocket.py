@@ -1,6 +1,56 @@
+import asyncio
 import random
 
 import pytest
+from fastapi import WebSocketDisconnect
+
+from server.db import OrderRow
+from server.main import (
+    CLIENT_QUEUE_SIZE,
+    active_connections,
+    client_writer,
+    close_tasks,
+    notify_status_change,
+)
+from server.models import OrderStatus
+
+
+async def broadcast_burst(count):
+    """Broadcast count status changes without yielding to the writer tasks"""
+    for i in range(count):
+        order = OrderRow(f"order-{i}", "BRST", float(i), OrderStatus.PENDING, 0.0)
+        await notify_status_change(order)
+
+
+class StalledWebSocket:
+    """WebSocket stand-in whose peer never accepts another frame"""
+
+    def __init__(self):
+        self.close_code = None
+
+    async def send_text(self, text):
+        await asyncio.Event().wait()
+
+    async def close(self, code=1000, reason=None):
+        self.close_code = code
+
+
+class BrokenWebSocket(StalledWebSocket):
+    """WebSocket stand-in whose sends fail"""
+
+    async def send_text(self, text):
+        raise RuntimeError("Unexpected ASGI message 'websocket.send'")
+
+
+async def broadcast_to_fake_client(websocket):
+    """Register a fake client, broadcast to it and wait for its writer to stop"""
+    queue = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+    writer_task = asyncio.create_task(client_writer(websocket, queue))
+    active_connections[websocket] = (queue, writer_task)
+
+    await broadcast_burst(1)
+    await writer_task
+    await asyncio.gather(*close_tasks)
 
 
 @pytest.mark.websocket
@@ -93,3 +143,84 @@ async def test_no_messages_after_cancel(client):
         # Verify no more messages are received
         with pytest.raises(Exception):
             websocket.receive_json(timeout=1.0)
+
+
+@pytest.mark.websocket
+async def test_ping_pong(client):
+    """Test that a ping is answered with a plain text pong"""
+    with client.websocket_connect("/ws") as websocket:
+        websocket.send_text("ping")
+        assert websocket.receive_text() == "pong"
+
+
+@pytest.mark.websocket
+async def test_single_event_is_not_batched(client):
+    """Test that a lone event is sent as a plain status_change message"""
+    with client.websocket_connect("/ws") as websocket:
+        # The pong confirms the connection is registered for broadcasts
+        websocket.send_text("ping")
+        assert websocket.receive_text() == "pong"
+
+        client.portal.call(broadcast_burst, 1)
+
+        data = websocket.receive_json()
+        assert data["type"] == "status_change"
+        assert data["data"]["order_id"] == "order-0"
+
+
+@pytest.mark.websocket
+async def test_burst_is_sent_as_one_batch(client):
+    """Test that events queued together arrive as one ordered batch frame"""
+    with client.websocket_connect("/ws") as websocket:
+        websocket.send_text("ping")
+        assert websocket.receive_text() == "pong"
+
+        client.portal.call(broadcast_burst, 3)
+
+        data = websocket.receive_json()
+        assert data["type"] == "batch"
+        assert [event["type"] for event in data["events"]] == ["status_change"] * 3
+        assert [event["data"]["order_id"] for event in data["events"]] == [
+            "order-0",
+            "order-1",
+            "order-2",
+        ]
+
+
+@pytest.mark.websocket
+async def test_client_disconnected_when_queue_overflows(client):
+    """Test that a client whose queue overflows is closed with code 1008"""
+    with client.websocket_connect("/ws") as websocket:
+        websocket.send_text("ping")
+        assert websocket.receive_text() == "pong"
+
+        # The writer cannot run during the burst, so the queue overflows
+        client.portal.call(broadcast_burst, CLIENT_QUEUE_SIZE + 1)
+        assert not active_connections
+
+        with pytest.raises(WebSocketDisconnect) as disconnect:
+            websocket.receive_json()
+        assert disconnect.value.code == 1008
+
+
+@pytest.mark.websocket
+async def test_client_disconnected_when_send_times_out(client, monkeypatch):
+    """Test that a client that stops accepting frames is closed with code 1008"""
+    monkeypatch.setattr("server.main.CLIENT_SEND_TIMEOUT", 0.05)
+    websocket = StalledWebSocket()
+
+    client.portal.call(broadcast_to_fake_client, websocket)
+
+    assert websocket not in active_connections
+    assert websocket.close_code == 1008
+
+
+@pytest.mark.websocket
+async def test_client_disconnected_when_send_fails(client):
+    """Test that a client whose writer fails is unregistered and closed"""
+    websocket = BrokenWebSocket()
+
+    client.portal.call(broadcast_to_fake_client, websocket)
+
+    assert websocket not in active_connections
+    assert websocket.close_code == 1008